@@ -4,7 +4,7 @@ from django.shortcuts import render, redirect
 from django.http import HttpResponse, JsonResponse
 from django import forms
 from django.contrib import messages
-from django.db.models import Sum, Count, Q, F, Value, DecimalField
+from django.db.models import Sum, Count, Q, F, Value, DecimalField, Prefetch
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.html import format_html
@@ -17,7 +17,8 @@ from datetime import timedelta
 from io import StringIO
 from .models import (
     Staff, Vehicle, Delivery, 
-    MonthlyPayment, PayrollManager, PaymentPeriod, StaffAssignment
+    MonthlyPayment, PayrollManager, PaymentPeriod, StaffAssignment,
+    month_name, invalidate_dashboard
 )
 
 admin.site.site_header = "Delivery Management System"
@@ -65,18 +66,14 @@ class PayrollManagerAdmin(admin.ModelAdmin):
         return False
     
     def get_queryset(self, request):
-        # Order by most recent first
-        return super().get_queryset(request).select_related(
-            'staff', 'delivery', 'delivery__vehicle'
+        # Order by most recent first; the delivery column lists its turnboys
+        return super().get_queryset(request).with_related().prefetch_related(
+            Prefetch('delivery__staffassignment_set', queryset=StaffAssignment.objects.select_related('staff'))
         ).order_by('-delivery__date', 'staff__name')
     
     def has_delete_permission(self, request, obj=None):
         # Allow deletion for testing but warn in the template
         return True
-    
-    def save_model(self, request, obj, form, change):
-        obj.total_pay = obj.role_pay + obj.loader_pay
-        super().save_model(request, obj, form, change)
 
 
 # Delivery Admin with enhanced features
@@ -88,6 +85,12 @@ class DeliveryAdmin(admin.ModelAdmin):
     autocomplete_fields = ['vehicle']
     list_per_page = 20
     
+    def get_queryset(self, request):
+        # __str__ shows the vehicle and turnboys, so load them with the page
+        return super().get_queryset(request).select_related('vehicle').prefetch_related(
+            Prefetch('staffassignment_set', queryset=StaffAssignment.objects.select_related('staff'))
+        )
+    
     fieldsets = (
         ('Delivery Information', {
             'fields': ('date', 'vehicle', 'destination')
@@ -165,7 +168,7 @@ class MonthlyPaymentAdmin(admin.ModelAdmin):
     def month_year(self, obj):
         return format_html(
             '<span style="white-space:nowrap;">{} {}</span>',
-            calendar.month_name[obj.month], obj.year
+            month_name(obj.month), obj.year
         )
     month_year.short_description = 'Month/Year'
     
@@ -182,14 +185,16 @@ class MonthlyPaymentAdmin(admin.ModelAdmin):
     
     def mark_as_paid(self, request, queryset):
         """Mark selected payments as paid"""
-        queryset.update(is_paid=True, payment_date=timezone.now().date())
-        messages.success(request, f"Marked {queryset.count()} payments as paid")
+        updated = queryset.update(is_paid=True, payment_date=timezone.now().date())
+        invalidate_dashboard()
+        messages.success(request, f"Marked {updated} payments as paid")
     mark_as_paid.short_description = "Mark selected payments as paid"
     
     def mark_as_unpaid(self, request, queryset):
         """Mark selected payments as unpaid"""
-        queryset.update(is_paid=False, payment_date=None)
-        messages.success(request, f"Marked {queryset.count()} payments as unpaid")
+        updated = queryset.update(is_paid=False, payment_date=None)
+        invalidate_dashboard()
+        messages.success(request, f"Marked {updated} payments as unpaid")
     mark_as_unpaid.short_description = "Mark selected payments as unpaid"
     
     def export_to_csv(self, request, queryset):
@@ -207,7 +212,7 @@ class MonthlyPaymentAdmin(admin.ModelAdmin):
             writer.writerow([
                 payment.staff.name,
                 payment.staff.get_role_display(),
-                calendar.month_name[payment.month],
+                month_name(payment.month),
                 payment.year,
                 payment.role_payment,
                 payment.loader_payment,
@@ -263,14 +268,14 @@ class PaymentPeriodAdmin(admin.ModelAdmin):
     
     def mark_as_paid(self, request, queryset):
         """Mark selected payments as paid"""
-        queryset.update(is_paid=True, payment_date=timezone.now().date())
-        messages.success(request, f"Marked {queryset.count()} payments as paid")
+        updated = queryset.update(is_paid=True, payment_date=timezone.now().date())
+        messages.success(request, f"Marked {updated} payments as paid")
     mark_as_paid.short_description = "Mark selected payments as paid"
     
     def mark_as_unpaid(self, request, queryset):
         """Mark selected payments as unpaid"""
-        queryset.update(is_paid=False, payment_date=None)
-        messages.success(request, f"Marked {queryset.count()} payments as unpaid")
+        updated = queryset.update(is_paid=False, payment_date=None)
+        messages.success(request, f"Marked {updated} payments as unpaid")
     mark_as_unpaid.short_description = "Mark selected payments as unpaid"
     
     def export_to_csv(self, request, queryset):
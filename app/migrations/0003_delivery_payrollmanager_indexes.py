@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-16 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_alter_delivery_notes_alter_staff_is_loader_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['date', 'vehicle'], name='app_deliver_date_e19705_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payrollmanager',
+            index=models.Index(fields=['delivery', 'staff'], name='app_payroll_deliver_b8841d_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-16 12:18
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_delivery_payrollmanager_indexes'),
+    ]
+
+    # A regular column can't be altered into a generated one, so each total is
+    # dropped and re-added; the database recomputes it from the two components.
+    operations = [
+        migrations.RemoveField(
+            model_name='monthlypayment',
+            name='total_payment',
+        ),
+        migrations.AddField(
+            model_name='monthlypayment',
+            name='total_payment',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('role_payment'), '+', models.F('loader_payment')), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+        migrations.RemoveField(
+            model_name='paymentperiod',
+            name='total_payment',
+        ),
+        migrations.AddField(
+            model_name='paymentperiod',
+            name='total_payment',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('role_payment'), '+', models.F('loader_payment')), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+        migrations.RemoveField(
+            model_name='payrollmanager',
+            name='total_pay',
+        ),
+        migrations.AddField(
+            model_name='payrollmanager',
+            name='total_pay',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('role_pay'), '+', models.F('loader_pay')), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+    ]
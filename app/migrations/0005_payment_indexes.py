@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-16 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_generated_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlypayment',
+            index=models.Index(fields=['year', 'month', 'is_paid'], name='app_monthly_year_0a585f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentperiod',
+            index=models.Index(fields=['staff', 'period_start', 'period_end'], name='app_payment_staff_i_e3f380_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentperiod',
+            index=models.Index(fields=['is_paid', 'period_end'], name='app_payment_is_paid_ed603c_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-16 12:20
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_loader_split(apps, schema_editor):
+    """Fill the new columns for deliveries saved before they existed"""
+    Delivery = apps.get_model('app', 'Delivery')
+    deliveries = Delivery.objects.annotate(
+        num_loaders=Count(
+            'staffassignment__staff',
+            filter=Q(staffassignment__helped_loading=True),
+            distinct=True,
+        )
+    ).filter(num_loaders__gt=0)
+
+    updated = []
+    for delivery in deliveries.iterator(chunk_size=500):
+        delivery.loader_count = delivery.num_loaders
+        delivery.per_loader_amount_cached = (
+            delivery.loading_amount / delivery.num_loaders
+        ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        updated.append(delivery)
+
+    Delivery.objects.bulk_update(
+        updated, ['loader_count', 'per_loader_amount_cached'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_payment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='loader_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='per_loader_amount_cached',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(backfill_loader_split, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-16 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_delivery_loader_split'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='staffassignment',
+            index=models.Index(fields=['staff', 'delivery'], name='app_staffas_staff_i_b3d262_idx'),
+        ),
+    ]
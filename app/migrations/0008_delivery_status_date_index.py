@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-16 12:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_staffassignment_staff_delivery_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['status', '-date'], name='app_deliver_status_58bb1b_idx'),
+        ),
+    ]
@@ -1,14 +1,132 @@
-from django.db import models
-from django.db.models import Sum, Count, Q
+from django.db import models, transaction
+from django.db.models import Sum, Count, Q, F
 from django.utils import timezone
+from django.core.cache import cache
 import calendar
+import threading
+import uuid
+import weakref
+from datetime import date
+from functools import lru_cache
 # Import User
 from django.contrib.auth.models import User
-from decimal import Decimal
-from django.db.models.signals import post_save, post_delete
+from decimal import Decimal, ROUND_HALF_UP
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
 
+# Shared Decimal constants, so hot paths don't re-parse Decimal strings
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+
+@lru_cache(maxsize=256)
+def month_bounds(year, month):
+    """Return the first and last date of a month"""
+    _, last_day = calendar.monthrange(year, month)
+    return date(year, month, 1), date(year, month, last_day)
+
+
+@lru_cache(maxsize=12)
+def month_name(month):
+    """Return the full name of a month number, e.g. 1 -> 'January'"""
+    return calendar.month_name[month]
+
+
+# Cached monthly payment totals live for a day; any payroll change in a month
+# bumps that month's version, which moves its totals to fresh cache keys
+MONTHLY_PAYMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _monthly_payment_version_key(year, month):
+    return f'monthly_payment_version:{year}:{month}'
+
+
+def _current_version(key):
+    # A version that is missing (never set, or culled from a full cache) starts
+    # as a fresh token; falling back to a fixed default would bring back
+    # whatever was cached under that default before the first bump
+    return cache.get_or_set(key, lambda: uuid.uuid4().hex, None)
+
+
+def monthly_payment_version(year, month):
+    """Current cache version of a month's payroll; part of any cache key built from it"""
+    return _current_version(_monthly_payment_version_key(year, month))
+
+
+def _bump_version(key):
+    # A fresh token rather than incr(): on the file-based cache incr() is a
+    # separate read and write, so two workers bumping together could both store
+    # the same next number and lose a change. Any new token retires the old keys.
+    cache.set(key, uuid.uuid4().hex, None)
+
+
+# Version bumps wait for the transaction to commit; bumped any earlier, another
+# request could read the new version while the database still holds the old
+# figures, and cache those under it. A transaction's bumps are collected on its
+# commit callback so each key is bumped once; like the payroll batch below, the
+# thread only holds a weak reference, so a rolled-back transaction takes its
+# bumps with it.
+_pending_versions = threading.local()
+
+
+class _VersionBumps:
+    """Commit callback bumping the cache versions a transaction expired"""
+
+    def __init__(self, key):
+        self.keys = {key}
+
+    def __call__(self):
+        bumps_ref = getattr(_pending_versions, 'bumps', None)
+        if bumps_ref is not None and bumps_ref() is self:
+            _pending_versions.bumps = None
+        for key in self.keys:
+            _bump_version(key)
+
+
+def _expire_version(key):
+    """Bump a cache version when the current transaction commits"""
+    bumps_ref = getattr(_pending_versions, 'bumps', None)
+    bumps = bumps_ref() if bumps_ref is not None else None
+    if bumps is not None:
+        bumps.keys.add(key)
+        return
+
+    # Outside a transaction on_commit() runs the bump straight away
+    bumps = _VersionBumps(key)
+    _pending_versions.bumps = weakref.ref(bumps)
+    transaction.on_commit(bumps)
+
+
+def invalidate_monthly_payments(*days):
+    """Expire the cached monthly payment totals for the months of these dates"""
+    for year, month in {(day.year, day.month) for day in days if day}:
+        _expire_version(_monthly_payment_version_key(year, month))
+    # The dashboard's payroll totals span every month
+    invalidate_dashboard()
+
+
+# The dashboard figures are cached under one version, bumped whenever anything
+# they count changes: staff, vehicles, deliveries, assignments, payments or payroll
+DASHBOARD_VERSION_KEY = 'dashboard_version'
+
+
+def dashboard_version():
+    """Current cache version of the dashboard figures"""
+    return _current_version(DASHBOARD_VERSION_KEY)
+
+
+def invalidate_dashboard():
+    """Expire the cached dashboard figures when the current transaction commits"""
+    _expire_version(DASHBOARD_VERSION_KEY)
+
+
+# The active staff listed in the payroll staff picker change rarely, so the list
+# is cached until any staff member is saved or deleted
+ACTIVE_STAFF_CACHE_KEY = 'active_non_driver_staff'
+ACTIVE_STAFF_CACHE_TIMEOUT = 60 * 5
+
+
 # ===================================================
 # Staff Model
 # ===================================================
@@ -37,15 +155,21 @@ class Staff(models.Model):
             self.is_loader = True
         super().clean()
         
+    @classmethod
+    def active_choices(cls):
+        """Active staff, drivers excluded, with the fields a staff picker shows"""
+        return cache.get_or_set(
+            ACTIVE_STAFF_CACHE_KEY,
+            lambda: list(cls.objects.filter(is_active=True).exclude(role='driver').only('id', 'name', 'role')),
+            ACTIVE_STAFF_CACHE_TIMEOUT
+        )
+    
     def get_monthly_payment(self, year, month):
         """
         Calculate total payment for this staff member for a specific month
         based on completed PayrollManager records
         """
-        # Create timezone-aware start and end dates for the month
-        start_date = timezone.datetime(year, month, 1).date()
-        _, last_day = calendar.monthrange(year, month)
-        end_date = timezone.datetime(year, month, last_day).date()
+        start_date, end_date = month_bounds(year, month)
 
         # Use PayrollManager records for more accurate payment calculation
         payments = PayrollManager.objects.filter(
@@ -56,16 +180,12 @@ class Staff(models.Model):
             total_loader=Sum('loader_pay'),
             total=Sum('total_pay')
         )
-        
-        role_payment = payments['total_role'] or Decimal('0.00')
-        loader_payment = payments['total_loader'] or Decimal('0.00')
-        total_payment = payments['total'] or Decimal('0.00')
-        
+
         return {
-            'role_payment': role_payment,
-            'loader_payment': loader_payment,
-            'total_payment': total_payment
-        }   
+            'role_payment': payments['total_role'] or ZERO,
+            'loader_payment': payments['total_loader'] or ZERO,
+            'total_payment': payments['total'] or ZERO,
+        }
         
         
 # ===================================================
@@ -121,20 +241,74 @@ class Delivery(models.Model):
     )
     notes = models.TextField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='completed')
+    # Denormalized loading split, kept up to date by the payroll recalculation
+    loader_count = models.PositiveSmallIntegerField(default=0, editable=False)
+    per_loader_amount_cached = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, editable=False
+    )
 
     class Meta:
         verbose_name_plural = "Deliveries"
         ordering = ['-date']
+        indexes = [
+            # Date range scans narrowed by vehicle (reports, admin filters)
+            models.Index(fields=['date', 'vehicle']),
+            # Status counts and newest-first lists of one status (dashboards)
+            models.Index(fields=['status', '-date']),
+        ]
 
     def __str__(self):
         driver_name = self.vehicle.driver if self.vehicle and self.vehicle.driver else "No driver"
-        turnboys = ", ".join([assign.staff.name for assign in self.staffassignment_set.filter(role='turnboy')])
+        turnboys = ", ".join(self.turnboy_names())
         turnboys_str = f" (Turnboys: {turnboys})" if turnboys else ""
         
         return f"Delivery to {self.destination} on {self.date} - {self.vehicle.plate_number} (Driver: {driver_name}){turnboys_str}"
 
+    # The fields the payroll is calculated from
+    PAYROLL_FIELDS = ('loading_amount', 'turnboy_payment_rate', 'date')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the payroll was calculated from, so saves that don't
+        # touch these values can skip the recalculation
+        instance._payroll_snapshot = instance._payroll_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Reloaded values are what the payroll now has to match; fields that
+        # weren't reloaded keep their snapshot, so unsaved edits still count
+        snapshot = getattr(self, '_payroll_snapshot', None) or (None,) * len(self.PAYROLL_FIELDS)
+        self._payroll_snapshot = tuple(
+            value if fields is None or name in fields else old
+            for name, value, old in zip(self.PAYROLL_FIELDS, self._payroll_values(), snapshot)
+        )
+
+    def _payroll_values(self):
+        # Read through __dict__ so deferred fields aren't fetched
+        return tuple(self.__dict__.get(name) for name in self.PAYROLL_FIELDS)
+
+    def turnboy_names(self):
+        """Return the names of the turnboys assigned to this delivery"""
+        # Reuse prefetched assignments; otherwise fetch just the names in one
+        # query rather than one Staff lookup per assignment
+        if 'staffassignment_set' in getattr(self, '_prefetched_objects_cache', {}):
+            return [a.staff.name for a in self.staffassignment_set.all() if a.role == 'turnboy']
+        
+        return list(
+            self.staffassignment_set.filter(role='turnboy').values_list('staff__name', flat=True)
+        )
+
     def get_loaders(self):
-        """Return a list of all staff who helped with loading for this delivery"""
+        """Return a queryset of all staff who helped with loading for this delivery"""
+        # With prefetched assignments the loaders' ids are already known, so
+        # filter on them instead of running a JOIN + DISTINCT
+        if 'staffassignment_set' in getattr(self, '_prefetched_objects_cache', {}):
+            return Staff.objects.filter(pk__in={
+                a.staff_id for a in self.staffassignment_set.all() if a.helped_loading
+            })
+        
         return Staff.objects.filter(
             staffassignment__delivery=self,
             staffassignment__helped_loading=True
@@ -142,19 +316,14 @@ class Delivery(models.Model):
 
     def total_loader_count(self):
         """Count the total number of people who helped with loading"""
-        return self.staffassignment_set.filter(helped_loading=True).count()
+        return self.loader_count
 
     def per_loader_amount(self):
         """
-        Calculate payment per loader, splitting loading money across all loaders
+        Payment per loader, the loading money split evenly across all loaders.
+        Stored by the payroll recalculation whenever assignments change.
         """
-        num_loaders = self.total_loader_count()
-        
-        if num_loaders == 0:
-            return Decimal('0.00')
-            
-        # Split loading amount evenly among all loaders
-        return self.loading_amount / Decimal(num_loaders)
+        return self.per_loader_amount_cached
 
 # ===================================================
 # LoaderAssignment Model and Staff Assignment
@@ -175,6 +344,10 @@ class StaffAssignment(models.Model):
     
     class Meta:
         unique_together = ('delivery', 'staff', 'role')  # Staff can have only one role per delivery
+        indexes = [
+            # A staff member's assignments joined to their deliveries (monthly reports)
+            models.Index(fields=['staff', 'delivery']),
+        ]
     
     def __str__(self):
         return f"{self.staff.name} as {self.get_role_display()} for {self.delivery}"
@@ -185,10 +358,6 @@ class StaffAssignment(models.Model):
             self.helped_loading = True
         
         super().clean()
-    
-    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
-        self.clean()
-        return super().save(force_insert, force_update, using, update_fields)
 
 
 # ===================================================
@@ -203,21 +372,24 @@ class MonthlyPayment(models.Model):
     role_payment = models.DecimalField(max_digits=10, decimal_places=2, default=0, 
                                        help_text="Payment for the staff's primary role (driver, turnboy, etc.)")
     loader_payment = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    total_payment = models.DecimalField(max_digits=10, decimal_places=2)
+    # Always the sum of role_payment and loader_payment, computed by the database
+    total_payment = models.GeneratedField(
+        expression=F('role_payment') + F('loader_payment'),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     is_paid = models.BooleanField(default=False)
     payment_date = models.DateField(null=True, blank=True)
     
     class Meta:
         unique_together = ('staff', 'year', 'month')
+        indexes = [
+            # Dashboard/payroll filters: a month's payments, paid or unpaid
+            models.Index(fields=['year', 'month', 'is_paid']),
+        ]
     
     def __str__(self):
-        month_name = calendar.month_name[self.month]
-        return f"{self.staff.name} - {month_name} {self.year}"
-    
-    def save(self, *args, **kwargs):
-        # Always ensure total_payment is the sum of role_payment and loader_payment
-        self.total_payment = self.role_payment + self.loader_payment
-        super().save(*args, **kwargs)
+        return f"{self.staff.name} - {month_name(self.month)} {self.year}"
 
 class PaymentPeriod(models.Model):
     admin = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -227,7 +399,12 @@ class PaymentPeriod(models.Model):
     period_end = models.DateField()
     role_payment = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     loader_payment = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    total_payment = models.DecimalField(max_digits=10, decimal_places=2)
+    # Always the sum of role_payment and loader_payment, computed by the database
+    total_payment = models.GeneratedField(
+        expression=F('role_payment') + F('loader_payment'),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     is_paid = models.BooleanField(default=False)
     payment_date = models.DateField(null=True, blank=True)
     
@@ -239,6 +416,12 @@ class PaymentPeriod(models.Model):
                 name='period_end_gte_period_start'
             )
         ]
+        indexes = [
+            # Lookups of a staff member's period by its exact date range
+            models.Index(fields=['staff', 'period_start', 'period_end']),
+            # Outstanding payments ordered by period end (payroll dashboard)
+            models.Index(fields=['is_paid', 'period_end']),
+        ]
     
     def __str__(self):
         return f"{self.staff.name} - {self.period_start} to {self.period_end}"
@@ -249,15 +432,16 @@ class PaymentPeriod(models.Model):
         start_str = self.period_start.strftime("%d %b %Y")
         end_str = self.period_end.strftime("%d %b %Y")
         return f"{start_str} to {end_str}"
-    
-    def save(self, *args, **kwargs):
-        # Always ensure total_payment is the sum of role_payment and loader_payment
-        self.total_payment = self.role_payment + self.loader_payment
-        super().save(*args, **kwargs)
 
 # ===================================================
 # PayrollManager Model
 # ===================================================
+class PayrollManagerQuerySet(models.QuerySet):
+    def with_related(self):
+        """Join in the staff, delivery and vehicle shown when listing records"""
+        return self.select_related('staff', 'delivery__vehicle')
+
+
 class PayrollManager(models.Model):
     admin = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     """Stores payments per delivery per staff member"""
@@ -271,16 +455,23 @@ class PayrollManager(models.Model):
         max_digits=10, decimal_places=2, default=0,
         help_text="Payment for loading activities if the staff helped with loading"
     )
-    total_pay = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Always the sum of role_pay and loader_pay, computed by the database
+    total_pay = models.GeneratedField(
+        expression=F('role_pay') + F('loader_pay'),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     date_recorded = models.DateTimeField(auto_now_add=True)
 
+    objects = PayrollManagerQuerySet.as_manager()
+
     class Meta:
         unique_together = ('staff', 'delivery')
-        
-    def save(self, *args, **kwargs):
-        # Always calculate total_pay as the sum of role_pay and loader_pay
-        self.total_pay = self.role_pay + self.loader_pay
-        super().save(*args, **kwargs)
+        indexes = [
+            # unique_together already covers (staff, delivery); this one serves
+            # the per-delivery lookups done when recalculating payroll
+            models.Index(fields=['delivery', 'staff']),
+        ]
         
     def __str__(self):
         return f"{self.staff.name} - {self.delivery} - Ksh {self.total_pay}"
@@ -288,11 +479,85 @@ class PayrollManager(models.Model):
 # ===================================================
 # Signal Handler(s)
 # ===================================================
-@receiver(post_save, sender=Delivery)
-@receiver(post_delete, sender=Delivery)
-def update_payroll_manager(sender, instance, **kwargs):
+# Deliveries whose payroll needs recalculating are collected per transaction,
+# so saving a Delivery together with its assignments only recalculates once.
+# The thread only keeps a weak reference to the transaction's commit callback,
+# which holds the batch: Django drops the callbacks of a transaction (or
+# savepoint) that rolls back, so its batch goes with them and the next save
+# starts a fresh one.
+_pending_payroll = threading.local()
+
+
+def _as_date(value):
+    # Delivery.date holds whatever was assigned until the instance is
+    # reloaded, which may be a 'YYYY-MM-DD' string
+    return Delivery._meta.get_field('date').to_python(value)
+
+
+class _PayrollFlush:
+    """Commit callback recalculating the deliveries queued in one transaction"""
+
+    def __init__(self, delivery_id):
+        self.delivery_ids = {delivery_id}
+
+    def __call__(self):
+        _flush_payroll_updates(self)
+
+
+def _schedule_payroll_update(delivery_id):
     """
-    Update payroll records when a delivery is saved or deleted.
+    Mark a delivery as needing a payroll recalculation. The work is deferred
+    until the current transaction commits (or runs straight away when there
+    is no transaction), and repeated requests for the same delivery collapse
+    into a single recalculation.
+    """
+    # Saves made by the recalculation itself must not queue another one
+    if getattr(_pending_payroll, 'active', False):
+        return
+
+    flush_ref = getattr(_pending_payroll, 'flush', None)
+    flush = flush_ref() if flush_ref is not None else None
+    if flush is not None:
+        flush.delivery_ids.add(delivery_id)
+        return
+
+    # First delivery of this transaction: the batch lives in its callback
+    flush = _PayrollFlush(delivery_id)
+    _pending_payroll.flush = weakref.ref(flush)
+    transaction.on_commit(flush)
+
+
+def _flush_payroll_updates(flush):
+    """Recalculate payroll for every delivery in a committed transaction's batch"""
+    # Later saves start a new batch rather than joining this one
+    flush_ref = getattr(_pending_payroll, 'flush', None)
+    if flush_ref is not None and flush_ref() is flush:
+        _pending_payroll.flush = None
+    delivery_ids = flush.delivery_ids
+
+    # Load the whole batch with its assignments up front; deliveries deleted
+    # in the meantime simply drop out. The recalculation only needs staff ids,
+    # so the staff rows aren't joined in. The delivery rows are locked (in pk
+    # order, so concurrent flushes can't deadlock) until the payroll is written.
+    deliveries = Delivery.objects.select_for_update().filter(
+        pk__in=delivery_ids
+    ).order_by('pk').prefetch_related('staffassignment_set')
+
+    # Commit callbacks run outside the original transaction; write the whole
+    # batch in one transaction rather than autocommitting every statement.
+    # The queryset is evaluated inside it, as select_for_update() requires.
+    _pending_payroll.active = True
+    try:
+        with transaction.atomic():
+            for delivery in deliveries:
+                recalculate_delivery_payroll(delivery)
+    finally:
+        _pending_payroll.active = False
+
+
+def recalculate_delivery_payroll(instance):
+    """
+    Recalculate the payroll records for a single delivery.
     This handles all payroll scenarios according to business rules:
     
     1. Single turnboy, no helpers: Turnboy gets fixed rate + full loading amount
@@ -300,41 +565,169 @@ def update_payroll_manager(sender, instance, **kwargs):
     3. Two turnboys, only one loads: Loading turnboy gets fixed + full loading, other only fixed
     4. Turnboy + other loaders: Loading amount split equally among all loading helpers
     """
-    # If a Delivery is deleted, clean up related records
-    if kwargs.get('signal') == post_delete:
-        PayrollManager.objects.filter(delivery=instance).delete()
-        return
-
-    # Get all staff who helped with loading
-    loading_staff = instance.get_loaders()
-    loading_count = len(loading_staff)
+    # Read the assignments once; everything below works on this list
+    assignments = list(instance.staffassignment_set.all())
     
-    # Get all turnboys for this delivery
-    turnboy_assignments = instance.staffassignment_set.filter(role='turnboy')
+    # Per-delivery values are the same for every assignment, so read them once
+    turnboy_rate = instance.turnboy_payment_rate
+    loading_amount = instance.loading_amount
     
-    # Process all staff assignments based on the four scenarios
-    for assignment in instance.staffassignment_set.all():
-        # Base role pay (always paid)
-        role_pay = instance.turnboy_payment_rate if assignment.role == 'turnboy' else Decimal('0.00')
+    # Count the distinct staff who helped with loading and split the
+    # loading money once for the whole delivery, rounded to the cent here so
+    # every share is stored exactly as it will be paid
+    loading_count = len({a.staff_id for a in assignments if a.helped_loading})
+    if loading_count:
+        per_loader = (loading_amount / loading_count).quantize(CENT, rounding=ROUND_HALF_UP)
+    else:
+        per_loader = ZERO
+    
+    # Work out what each assigned staff member should be paid. A staff member
+    # can hold more than one assignment on a delivery, so merge them.
+    desired = {}
+    for assignment in assignments:
+        role_pay, loader_pay = desired.get(assignment.staff_id, (ZERO, ZERO))
         
-        # Calculate loader pay based on whether they helped loading
-        loader_pay = Decimal('0.00')
+        # Base role pay (always paid)
+        if assignment.role == 'turnboy':
+            role_pay = turnboy_rate
         
-        if assignment.helped_loading and loading_count > 0:
-            # Staff helped with loading, calculate their share
-            per_loader = instance.loading_amount / Decimal(loading_count)
+        if assignment.helped_loading:
+            # Staff helped with loading, they get an equal share
             loader_pay = per_loader
         
-        # Update or create the payroll record
-        PayrollManager.objects.update_or_create(
-            staff=assignment.staff,
+        desired[assignment.staff_id] = (role_pay, loader_pay)
+    
+    # Diff against the stored records so only new or changed rows are written.
+    # Only the columns the diff compares are loaded.
+    existing = {
+        record.staff_id: record
+        for record in PayrollManager.objects.filter(delivery=instance).only(
+            'staff', 'role_pay', 'loader_pay'
+        )
+    }
+    
+    changed = [
+        PayrollManager(
+            staff_id=staff_id,
             delivery=instance,
-            defaults={
-                'role_pay': role_pay,
-                'loader_pay': loader_pay,
-                'total_pay': role_pay + loader_pay,
-            }
+            role_pay=role_pay,
+            loader_pay=loader_pay,
         )
+        for staff_id, (role_pay, loader_pay) in desired.items()
+        if staff_id not in existing
+        or (existing[staff_id].role_pay, existing[staff_id].loader_pay) != (role_pay, loader_pay)
+    ]
+    
+    # Store the loading split on the delivery when it has changed; update()
+    # skips signals so this doesn't queue another recalculation
+    if (instance.loader_count, instance.per_loader_amount_cached) != (loading_count, per_loader):
+        Delivery.objects.filter(pk=instance.pk).update(
+            loader_count=loading_count,
+            per_loader_amount_cached=per_loader,
+        )
+        instance.loader_count = loading_count
+        instance.per_loader_amount_cached = per_loader
+    
+    # New and changed rows go out as one INSERT ... ON CONFLICT DO UPDATE.
+    # total_pay is a generated column, so only the two components are written.
+    PayrollManager.objects.bulk_create(
+        changed,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['staff', 'delivery'],
+        update_fields=['role_pay', 'loader_pay'],
+    )
+    
+    # Staff no longer assigned to this delivery should not keep being paid for it
+    removed_staff_ids = existing.keys() - desired.keys()
+    if removed_staff_ids:
+        PayrollManager.objects.filter(delivery=instance, staff_id__in=removed_staff_ids).delete()
+    
+    if changed or removed_staff_ids:
+        invalidate_monthly_payments(instance.date)
+
+
+@receiver(post_save, sender=Delivery)
+@receiver(post_delete, sender=Delivery)
+def update_payroll_manager(sender, instance, **kwargs):
+    """
+    Update payroll records when a delivery is saved or deleted.
+    The recalculation itself is queued and runs once the transaction commits.
+    """
+    # Fixture loading (loaddata) saves rows in an arbitrary order, so the
+    # payroll would be calculated from a half-loaded delivery
+    if kwargs.get('raw'):
+        return
+
+    # If a Delivery is deleted, clean up related records
+    if kwargs.get('signal') == post_delete:
+        PayrollManager.objects.filter(delivery=instance).delete()
+        invalidate_monthly_payments(_as_date(instance.date))
+        return
+
+    # Nothing the payroll depends on changed (assignment changes are handled
+    # by their own receiver)
+    payroll_values = instance._payroll_values()
+    snapshot = getattr(instance, '_payroll_snapshot', None)
+    if not kwargs.get('created') and snapshot == payroll_values:
+        return
+    instance._payroll_snapshot = payroll_values
+
+    # A delivery moved to another date takes its payroll out of the old month
+    if snapshot is not None and snapshot[2] != payroll_values[2]:
+        invalidate_monthly_payments(_as_date(snapshot[2]), _as_date(payroll_values[2]))
+
+    _schedule_payroll_update(instance.pk)
+
+
+@receiver(post_save, sender=PayrollManager)
+@receiver(post_delete, sender=PayrollManager)
+def expire_monthly_payments_on_payroll_edit(sender, instance, **kwargs):
+    """
+    Payroll records edited or deleted one at a time (through the admin) change
+    that month's totals. Rows the recalculation writes go through bulk
+    queries, which send no signals, and it expires the month itself.
+    """
+    # Raw fixture loads, and the recalculation's own deletes (it expires the
+    # month itself once it is done)
+    if kwargs.get('raw') or getattr(_pending_payroll, 'active', False):
+        return
+
+    # Removed along with their delivery; its own receiver expires the month
+    origin = kwargs.get('origin')
+    if isinstance(origin, Delivery) or getattr(origin, 'model', None) is Delivery:
+        return
+
+    delivery_date = Delivery.objects.filter(pk=instance.delivery_id).values_list('date', flat=True).first()
+    invalidate_monthly_payments(delivery_date)
+
+
+@receiver([post_save, post_delete], sender=Staff)
+@receiver([post_save, post_delete], sender=Vehicle)
+@receiver([post_save, post_delete], sender=Delivery)
+@receiver([post_save, post_delete], sender=StaffAssignment)
+@receiver([post_save, post_delete], sender=MonthlyPayment)
+def expire_dashboard(sender, **kwargs):
+    """Anything the dashboard counts has changed, so drop its cached figures"""
+    invalidate_dashboard()
+
+
+@receiver([post_save, post_delete], sender=Staff)
+def expire_active_staff(sender, **kwargs):
+    """A staff member changed, so the cached staff picker list is stale"""
+    # Deleted only once the change commits, otherwise a request in between
+    # could cache the old list again
+    transaction.on_commit(lambda: cache.delete(ACTIVE_STAFF_CACHE_KEY))
+
+
+@receiver(pre_save, sender=StaffAssignment)
+def mark_loaders_as_loading(sender, instance, **kwargs):
+    """
+    Loaders always help with loading. This only sets the flag, so saves that
+    don't go through a form skip the rest of the model validation.
+    """
+    if instance.role == 'loader':
+        instance.helped_loading = True
 
 
 @receiver(post_save, sender=StaffAssignment)
@@ -344,8 +737,15 @@ def update_payroll_on_staff_assignment_change(sender, instance, **kwargs):
     When staff assignments change (add/remove), recalculate all payroll records
     for this delivery to ensure per_loader amounts are correct.
     """
-    if hasattr(instance, 'delivery'):
-        delivery = instance.delivery
-        
-        # We'll use the delivery signal handler to recalculate everything
-        update_payroll_manager(Delivery, delivery)
\ No newline at end of file
+    if kwargs.get('raw'):
+        return
+
+    # Assignments removed because their delivery is being deleted; the
+    # delivery's own receiver clears its payroll
+    origin = kwargs.get('origin')
+    if isinstance(origin, Delivery) or getattr(origin, 'model', None) is Delivery:
+        return
+
+    # Queue by id so the delivery row doesn't have to be fetched per assignment
+    if instance.delivery_id:
+        _schedule_payroll_update(instance.delivery_id)
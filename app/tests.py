@@ -1,3 +1,328 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import (
+    Staff, Vehicle, Delivery, StaffAssignment, PayrollManager,
+    MonthlyPayment, PaymentPeriod, recalculate_delivery_payroll,
+    dashboard_version, DASHBOARD_VERSION_KEY, _bump_version,
+    monthly_payment_version,
+)
+
+
+# Cached payroll totals are keyed by row ids, which every test run reuses, so
+# the tests keep their cache in memory rather than in the shared cache files
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PayrollTestCase(TestCase):
+    """Shared fixtures for tests of the payroll recalculation"""
+
+    def setUp(self):
+        # Payroll is recalculated once the transaction commits, which never
+        # happens inside a TestCase, so run the commit callbacks by hand
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehicle = Vehicle.objects.create(plate_number='KAA 001A')
+            self.turnboy = Staff.objects.create(name='Turnboy', role='turnboy', is_loader=False)
+            self.loader = Staff.objects.create(name='Loader', role='loader')
+            self.other_loader = Staff.objects.create(name='Other Loader', role='loader')
+
+    def create_delivery(self, **kwargs):
+        fields = {
+            'date': date(2025, 5, 4),
+            'vehicle': self.vehicle,
+            'destination': 'Nakuru',
+            'items_carried': 'Cement',
+            'loading_amount': Decimal('100.00'),
+            'turnboy_payment_rate': Decimal('200.00'),
+        }
+        fields.update(kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Delivery.objects.create(**fields)
+
+    def assign(self, delivery, staff, role, helped_loading=False):
+        with self.captureOnCommitCallbacks(execute=True):
+            return StaffAssignment.objects.create(
+                delivery=delivery, staff=staff, role=role, helped_loading=helped_loading
+            )
+
+    def payroll(self, delivery):
+        """{staff name: (role pay, loader pay)} for a delivery"""
+        return {
+            record.staff.name: (record.role_pay, record.loader_pay)
+            for record in PayrollManager.objects.filter(delivery=delivery).select_related('staff')
+        }
+
+
+class PayrollCalculationTests(PayrollTestCase):
+
+    def test_loading_amount_is_split_evenly_and_rounded_to_the_cent(self):
+        delivery = self.create_delivery()
+        self.assign(delivery, self.turnboy, 'turnboy', helped_loading=True)
+        self.assign(delivery, self.loader, 'loader')
+        self.assign(delivery, self.other_loader, 'loader')
+
+        share = Decimal('33.33')
+        self.assertEqual(self.payroll(delivery), {
+            'Turnboy': (Decimal('200.00'), share),
+            'Loader': (Decimal('0.00'), share),
+            'Other Loader': (Decimal('0.00'), share),
+        })
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.loader_count, 3)
+        self.assertEqual(delivery.per_loader_amount(), share)
+
+    def test_turnboy_who_does_not_load_gets_only_the_turnboy_rate(self):
+        delivery = self.create_delivery()
+        self.assign(delivery, self.turnboy, 'turnboy')
+        self.assign(delivery, self.loader, 'loader')
+
+        self.assertEqual(self.payroll(delivery), {
+            'Turnboy': (Decimal('200.00'), Decimal('0.00')),
+            'Loader': (Decimal('0.00'), Decimal('100.00')),
+        })
+
+    def test_adding_a_loader_recalculates_the_shares(self):
+        delivery = self.create_delivery()
+        self.assign(delivery, self.loader, 'loader')
+        self.assertEqual(self.payroll(delivery), {'Loader': (Decimal('0.00'), Decimal('100.00'))})
+
+        self.assign(delivery, self.other_loader, 'loader')
+        self.assertEqual(self.payroll(delivery), {
+            'Loader': (Decimal('0.00'), Decimal('50.00')),
+            'Other Loader': (Decimal('0.00'), Decimal('50.00')),
+        })
+
+    def test_removing_an_assignment_drops_its_pay_and_recalculates_the_shares(self):
+        delivery = self.create_delivery()
+        self.assign(delivery, self.loader, 'loader')
+        assignment = self.assign(delivery, self.other_loader, 'loader')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.delete()
+        self.assertEqual(self.payroll(delivery), {'Loader': (Decimal('0.00'), Decimal('100.00'))})
+
+    def test_changing_the_loading_amount_recalculates_the_shares(self):
+        delivery = self.create_delivery()
+        self.assign(delivery, self.loader, 'loader')
+        self.assign(delivery, self.other_loader, 'loader')
+
+        delivery.loading_amount = Decimal('301.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            delivery.save()
+        self.assertEqual(self.payroll(delivery), {
+            'Loader': (Decimal('0.00'), Decimal('150.50')),
+            'Other Loader': (Decimal('0.00'), Decimal('150.50')),
+        })
+
+    def test_saving_a_refreshed_delivery_back_to_an_earlier_amount_recalculates(self):
+        delivery = self.create_delivery(loading_amount=Decimal('300.00'))
+        self.assign(delivery, self.loader, 'loader')
+
+        # Another request changes the amount through its own instance
+        other = Delivery.objects.get(pk=delivery.pk)
+        other.loading_amount = Decimal('600.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        self.assertEqual(self.payroll(delivery), {'Loader': (Decimal('0.00'), Decimal('600.00'))})
+
+        delivery.refresh_from_db()
+        delivery.loading_amount = Decimal('300.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            delivery.save()
+        self.assertEqual(self.payroll(delivery), {'Loader': (Decimal('0.00'), Decimal('300.00'))})
+
+    def test_partial_refresh_keeps_unsaved_amount_changes(self):
+        delivery = self.create_delivery()
+        self.assign(delivery, self.loader, 'loader')
+
+        delivery.loading_amount = Decimal('250.00')
+        delivery.refresh_from_db(fields=['status'])
+        with self.captureOnCommitCallbacks(execute=True):
+            delivery.save()
+        self.assertEqual(self.payroll(delivery), {'Loader': (Decimal('0.00'), Decimal('250.00'))})
+
+    def test_deleting_a_delivery_removes_its_payroll(self):
+        delivery = self.create_delivery()
+        self.assign(delivery, self.turnboy, 'turnboy')
+        self.assign(delivery, self.loader, 'loader')
+        kept = self.create_delivery(destination='Eldoret')
+        self.assign(kept, self.loader, 'loader')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            delivery.delete()
+        self.assertFalse(PayrollManager.objects.filter(delivery_id=delivery.pk).exists())
+        self.assertEqual(self.payroll(kept), {'Loader': (Decimal('0.00'), Decimal('100.00'))})
+
+
+class PayrollRollbackTests(PayrollTestCase):
+
+    def test_rolled_back_assignment_is_not_recalculated(self):
+        delivery = self.create_delivery()
+        self.assign(delivery, self.turnboy, 'turnboy')
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    StaffAssignment.objects.create(delivery=delivery, staff=self.loader, role='loader')
+                    raise RuntimeError
+        self.assertEqual(callbacks, [])
+
+        # The next commit only recalculates the delivery it touched
+        other = self.create_delivery(destination='Eldoret')
+        with mock.patch('app.models.recalculate_delivery_payroll', wraps=recalculate_delivery_payroll) as recalculate:
+            self.assign(other, self.loader, 'loader')
+        self.assertEqual([call.args[0].pk for call in recalculate.call_args_list], [other.pk])
+
+        # The rolled-back loader was never paid for the first delivery
+        self.assertEqual(self.payroll(delivery), {'Turnboy': (Decimal('200.00'), Decimal('0.00'))})
+
+    def test_failed_flush_leaves_nothing_queued(self):
+        delivery = self.create_delivery()
+        with mock.patch('app.models.recalculate_delivery_payroll', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.assign(delivery, self.turnboy, 'turnboy')
+
+        other = self.create_delivery(destination='Eldoret')
+        with mock.patch('app.models.recalculate_delivery_payroll', wraps=recalculate_delivery_payroll) as recalculate:
+            self.assign(other, self.turnboy, 'turnboy')
+        self.assertEqual([call.args[0].pk for call in recalculate.call_args_list], [other.pk])
+
+
+class DashboardExpiryTests(PayrollTestCase):
+
+    def test_dashboard_expires_once_when_the_transaction_commits(self):
+        before = dashboard_version()
+        with mock.patch('app.models._bump_version', wraps=_bump_version) as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                delivery = Delivery.objects.create(
+                    date=date(2025, 5, 4), vehicle=self.vehicle, destination='Nakuru',
+                    items_carried='Cement', loading_amount=Decimal('100.00'),
+                )
+                StaffAssignment.objects.create(delivery=delivery, staff=self.turnboy, role='turnboy')
+                StaffAssignment.objects.create(delivery=delivery, staff=self.loader, role='loader')
+                self.assertEqual(dashboard_version(), before)
+        self.assertNotEqual(dashboard_version(), before)
+        self.assertEqual(
+            [call for call in bump.call_args_list if call.args == (DASHBOARD_VERSION_KEY,)],
+            [mock.call(DASHBOARD_VERSION_KEY)]
+        )
+
+    def test_rolled_back_changes_do_not_expire_the_dashboard(self):
+        before = dashboard_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    Staff.objects.create(name='Temporary')
+                    raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(dashboard_version(), before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Staff.objects.create(name='Permanent')
+        self.assertNotEqual(dashboard_version(), before)
+
+
+class MonthlyPaymentExpiryTests(PayrollTestCase):
+
+    def test_month_version_changes_only_when_the_transaction_commits(self):
+        delivery = self.create_delivery()
+        before = monthly_payment_version(2025, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StaffAssignment.objects.create(delivery=delivery, staff=self.loader, role='loader')
+            self.assertEqual(monthly_payment_version(2025, 5), before)
+        after_assignment = monthly_payment_version(2025, 5)
+        self.assertNotEqual(after_assignment, before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            delivery.delete()
+            self.assertEqual(monthly_payment_version(2025, 5), after_assignment)
+        self.assertNotEqual(monthly_payment_version(2025, 5), after_assignment)
+
+    def test_rolled_back_payroll_edit_keeps_the_month_version(self):
+        delivery = self.create_delivery()
+        self.assign(delivery, self.loader, 'loader')
+        before = monthly_payment_version(2025, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    PayrollManager.objects.filter(delivery=delivery).get().delete()
+                    raise RuntimeError
+        self.assertEqual(monthly_payment_version(2025, 5), before)
+
+
+class CacheVersionTests(PayrollTestCase):
+
+    def test_lost_version_gets_a_fresh_token(self):
+        before = dashboard_version()
+        self.assertEqual(dashboard_version(), before)
+
+        # A culled version must not fall back to a value used before
+        cache.delete(DASHBOARD_VERSION_KEY)
+        self.assertNotIn(dashboard_version(), (before, 0))
+
+
+class ActiveStaffExpiryTests(PayrollTestCase):
+
+    def test_staff_list_expires_only_after_commit(self):
+        self.assertIn(self.loader.id, [s.id for s in Staff.active_choices()])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.loader.is_active = False
+            self.loader.save()
+            # Still cached until the transaction commits
+            self.assertIn(self.loader.id, [s.id for s in Staff.active_choices()])
+
+        self.assertNotIn(self.loader.id, [s.id for s in Staff.active_choices()])
+
+
+class MarkPaidTests(PayrollTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('clerk', password='secret')
+        self.client.force_login(self.user)
+        delivery = self.create_delivery()
+        self.assign(delivery, self.turnboy, 'turnboy')
+        self.assign(delivery, self.loader, 'loader')
+
+    def test_staff_payroll_marks_the_selected_staff_paid_for_the_month(self):
+        response = self.client.post(
+            reverse('staff_payroll') + '?year=2025&month=5',
+            {'mark_paid': '1', 'staff_id': [self.turnboy.pk]}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        payment = MonthlyPayment.objects.get(staff=self.turnboy, year=2025, month=5)
+        self.assertTrue(payment.is_paid)
+        self.assertIsNotNone(payment.payment_date)
+        self.assertEqual(payment.total_payment, Decimal('200.00'))
+        self.assertFalse(MonthlyPayment.objects.filter(staff=self.loader).exists())
+
+        paid = {row['staff'].name: row['is_paid'] for row in response.context['payroll_data']}
+        self.assertTrue(paid['Turnboy'])
+        self.assertFalse(paid['Loader'])
+
+    def test_period_payroll_pays_existing_periods_and_creates_missing_ones(self):
+        PaymentPeriod.objects.create(
+            staff=self.turnboy,
+            period_start=date(2025, 5, 1),
+            period_end=date(2025, 5, 31),
+            role_payment=Decimal('200.00'),
+        )
+        response = self.client.post(
+            reverse('period_payroll') + '?start_date=2025-05-01&end_date=2025-05-31',
+            {'mark_paid': '1', 'staff_ids': [self.turnboy.pk, self.loader.pk]}
+        )
+        self.assertEqual(response.status_code, 302)
+
+        periods = PaymentPeriod.objects.filter(period_start=date(2025, 5, 1), period_end=date(2025, 5, 31))
+        self.assertEqual(periods.count(), 2)
+        self.assertFalse(periods.filter(is_paid=False).exists())
+        self.assertEqual(periods.get(staff=self.loader).total_payment, Decimal('100.00'))
@@ -1,5 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 # /////Django Query Imports////
 from .models import *
 from django.db.models import Sum, Count, Q, F
@@ -10,7 +10,6 @@ import csv
 from decimal import Decimal
 from django.contrib import messages
 from django.utils import timezone
-import calendar
 from collections import defaultdict
 
 from datetime import datetime, timedelta
@@ -65,12 +64,15 @@ def logout_view(request):
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Count, Sum, F, Q
-from django.db.models.functions import TruncMonth, TruncWeek
-import calendar
+from django.db.models import Avg, Count, Sum, F, Q, Prefetch, Value, DecimalField
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
 from decimal import Decimal
 from datetime import datetime, timedelta
 import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+import time
 
 from .models import (
     Staff, 
@@ -79,21 +81,22 @@ from .models import (
     StaffAssignment, 
     MonthlyPayment, 
     PaymentPeriod,
-    PayrollManager
+    PayrollManager,
+    month_bounds,
+    month_name,
+    dashboard_version,
+    invalidate_dashboard,
+    monthly_payment_version,
+    MONTHLY_PAYMENT_CACHE_TIMEOUT
 )
 
-@login_required
-def dashboard(request):
-    """Main dashboard view displaying summary of operations"""
-    # Get current date and time info
-    today = timezone.now().date()
+def _dashboard_stats(today):
+    """Compute the dashboard's counts, totals and rankings for today's month"""
     current_month = today.month
     current_year = today.year
     
     # Calculate dates for filtering
-    start_of_month = timezone.datetime(current_year, current_month, 1).date()
-    _, last_day = calendar.monthrange(current_year, current_month)
-    end_of_month = timezone.datetime(current_year, current_month, last_day).date()
+    start_of_month, end_of_month = month_bounds(current_year, current_month)
     
     # Last 30 days
     thirty_days_ago = today - timedelta(days=30)
@@ -102,25 +105,22 @@ def dashboard(request):
     active_staff_count = Staff.objects.filter(is_active=True).count()
     active_vehicles_count = Vehicle.objects.filter(is_active=True).count()
     
-    # Get delivery stats
-    total_deliveries = Delivery.objects.count()
-    month_deliveries = Delivery.objects.filter(date__range=(start_of_month, end_of_month)).count()
-    recent_deliveries = Delivery.objects.filter(date__range=(thirty_days_ago, today)).count()
-    
-    # Get pending deliveries
-    pending_deliveries = Delivery.objects.filter(status='pending').count()
-    in_progress_deliveries = Delivery.objects.filter(status='in_progress').count()
+    # Get delivery stats, including pending ones, in a single pass
+    delivery_stats = Delivery.objects.aggregate(
+        total=Count('id'),
+        month=Count('id', filter=Q(date__range=(start_of_month, end_of_month))),
+        recent=Count('id', filter=Q(date__range=(thirty_days_ago, today))),
+        pending=Count('id', filter=Q(status='pending')),
+        in_progress=Count('id', filter=Q(status='in_progress'))
+    )
     
     # Calculate payroll stats
-    total_payroll = PayrollManager.objects.all().aggregate(
-        total=Sum('total_pay')
-    )['total'] or Decimal('0.00')
-    
-    month_payroll = PayrollManager.objects.filter(
-        delivery__date__range=(start_of_month, end_of_month)
-    ).aggregate(
-        total=Sum('total_pay')
-    )['total'] or Decimal('0.00')
+    payroll_stats = PayrollManager.objects.aggregate(
+        total=Sum('total_pay'),
+        month=Sum('total_pay', filter=Q(delivery__date__range=(start_of_month, end_of_month)))
+    )
+    total_payroll = payroll_stats['total'] or Decimal('0.00')
+    month_payroll = payroll_stats['month'] or Decimal('0.00')
     
     # Get monthly delivery trends - last 6 months
     six_months_ago = today - timedelta(days=180)
@@ -142,24 +142,21 @@ def dashboard(request):
         monthly_labels.append(month_str)
         monthly_counts.append(item['count'])
     
-    # Get recent deliveries for display
-    recent_delivery_list = Delivery.objects.all().order_by('-date')[:5]
-    
     # Top staff by deliveries in the current month
-    top_staff = StaffAssignment.objects.filter(
+    top_staff = list(StaffAssignment.objects.filter(
         delivery__date__range=(start_of_month, end_of_month)
     ).values(
         'staff__name', 'staff__role'
     ).annotate(
         delivery_count=Count('delivery')
-    ).order_by('-delivery_count')[:5]
+    ).order_by('-delivery_count')[:5])
     
     # Top destinations
-    top_destinations = Delivery.objects.values(
+    top_destinations = list(Delivery.objects.values(
         'destination'
     ).annotate(
         count=Count('id')
-    ).order_by('-count')[:5]
+    ).order_by('-count')[:5])
     
     # Status of monthly payments
     payment_stats = MonthlyPayment.objects.filter(
@@ -172,46 +169,99 @@ def dashboard(request):
     )
     
     # Vehicle usage stats
-    vehicle_usage = Delivery.objects.filter(
+    vehicle_usage = list(Delivery.objects.filter(
         date__range=(thirty_days_ago, today)
     ).values(
         'vehicle__plate_number'
     ).annotate(
         trip_count=Count('id')
-    ).order_by('-trip_count')
+    ).order_by('-trip_count'))
     
-    # Prepare data for passing to the template
-    context = {
-        # Basic counts
+    return {
         'active_staff_count': active_staff_count,
         'active_vehicles_count': active_vehicles_count,
-        'total_deliveries': total_deliveries,
-        'month_deliveries': month_deliveries,
-        'recent_deliveries': recent_deliveries,
-        
-        # Delivery status
-        'pending_deliveries': pending_deliveries,
-        'in_progress_deliveries': in_progress_deliveries,
-        
-        # Financial stats
+        'total_deliveries': delivery_stats['total'],
+        'month_deliveries': delivery_stats['month'],
+        'recent_deliveries': delivery_stats['recent'],
+        'pending_deliveries': delivery_stats['pending'],
+        'in_progress_deliveries': delivery_stats['in_progress'],
         'total_payroll': total_payroll,
         'month_payroll': month_payroll,
+        'monthly_labels': monthly_labels,
+        'monthly_counts': monthly_counts,
+        'top_staff': top_staff,
+        'top_destinations': top_destinations,
+        'vehicle_usage': vehicle_usage,
+        'payment_stats': payment_stats,
+    }
+
+
+def _log_dashboard_plans(today):
+    """Log the dashboard's queries, slowest first, with the database's plan for each"""
+    queries = []
+    
+    def record(execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not many:
+                queries.append((time.monotonic() - start, sql, params))
+    
+    with connection.execute_wrapper(record):
+        _dashboard_stats(today)
+    
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        for duration, sql, params in sorted(queries, key=lambda q: q[0], reverse=True):
+            cursor.execute(f"{prefix} {sql}", params)
+            plan = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+            logger.debug("dashboard query took %.3fs: %s %r\n%s", duration, sql, params, plan)
+
+
+# The dashboard figures move on a scale of minutes, so they are cached briefly.
+# The key also carries the dashboard version, which any change to the figures'
+# sources bumps, so edits show straight away.
+DASHBOARD_CACHE_TIMEOUT = 60 * 5
+
+
+@login_required
+def dashboard(request):
+    """Main dashboard view displaying summary of operations"""
+    # Get current date and time info
+    today = timezone.now().date()
+    current_month = today.month
+    current_year = today.year
+    
+    # Development aid: ?explain=1 logs the query plans behind the figures
+    if settings.DEBUG and request.user.is_staff and request.GET.get('explain'):
+        _log_dashboard_plans(today)
+    
+    cache_key = f'dashboard:{today.isoformat()}:{dashboard_version()}'
+    stats = cache.get(cache_key)
+    if stats is None:
+        stats = _dashboard_stats(today)
+        cache.set(cache_key, stats, DASHBOARD_CACHE_TIMEOUT)
+    
+    # Get recent deliveries for display; the table only shows these columns
+    recent_delivery_list = Delivery.objects.only(
+        'id', 'date', 'destination', 'status'
+    ).order_by('-date')[:5]
+    
+    # Prepare data for passing to the template: the cached counts, totals and
+    # rankings, plus the parts that are cheap or need converting
+    context = {
+        **stats,
         
         # Chart data (converted to JSON for JavaScript)
-        'monthly_labels': json.dumps(monthly_labels),
-        'monthly_counts': json.dumps(monthly_counts),
+        'monthly_labels': json.dumps(stats['monthly_labels']),
+        'monthly_counts': json.dumps(stats['monthly_counts']),
         
         # Lists for tables
         'recent_delivery_list': recent_delivery_list,
-        'top_staff': top_staff,
-        'top_destinations': top_destinations,
-        'vehicle_usage': vehicle_usage,
-        
-        # Payment status
-        'payment_stats': payment_stats,
         
         # Time context
-        'current_month': calendar.month_name[current_month],
+        'current_month': month_name(current_month),
         'current_year': current_year,
     }
     
@@ -226,13 +276,15 @@ def staff_dashboard(request):
     current_year = today.year
     
     # Calculate date ranges
-    start_of_month = timezone.datetime(current_year, current_month, 1).date()
-    _, last_day = calendar.monthrange(current_year, current_month)
-    end_of_month = timezone.datetime(current_year, current_month, last_day).date()
+    start_of_month, end_of_month = month_bounds(current_year, current_month)
     
-    # Get active staff with role counts
-    turnboy_count = Staff.objects.filter(is_active=True, role='turnboy').count()
-    loader_count = Staff.objects.filter(is_active=True, role='loader').count()
+    # Get active staff with role counts, both from one query
+    role_counts = Staff.objects.filter(is_active=True).aggregate(
+        turnboy_count=Count('id', filter=Q(role='turnboy')),
+        loader_count=Count('id', filter=Q(role='loader'))
+    )
+    turnboy_count = role_counts['turnboy_count']
+    loader_count = role_counts['loader_count']
     
     # Staff with most deliveries this month
     top_staff_deliveries = StaffAssignment.objects.filter(
@@ -264,15 +316,17 @@ def staff_dashboard(request):
         staff_unpaid=Count('id', filter=Q(is_paid=False))
     )
     
-    # Staff who helped loading the most
+    # Staff who helped loading the most, with their loading earnings summed
+    # from each delivery's stored per-loader share
     top_loaders = StaffAssignment.objects.filter(
         helped_loading=True,
         delivery__date__range=(start_of_month, end_of_month)
     ).values(
         'staff__id', 'staff__name'
     ).annotate(
-        loading_count=Count('delivery')
-    ).order_by('-loading_count')[:5]
+        loading_count=Count('delivery'),
+        loading_earnings=Sum('delivery__per_loader_amount_cached')
+    ).order_by('-loading_count', '-loading_earnings')[:5]
     
     # Recent payments made
     recent_payments = MonthlyPayment.objects.filter(
@@ -288,7 +342,7 @@ def staff_dashboard(request):
         'payment_status': payment_status,
         'top_loaders': top_loaders,
         'recent_payments': recent_payments,
-        'current_month': calendar.month_name[current_month],
+        'current_month': month_name(current_month),
         'current_year': current_year,
     }
     
@@ -303,9 +357,7 @@ def delivery_dashboard(request):
     current_year = today.year
     
     # Calculate date ranges
-    start_of_month = timezone.datetime(current_year, current_month, 1).date()
-    _, last_day = calendar.monthrange(current_year, current_month)
-    end_of_month = timezone.datetime(current_year, current_month, last_day).date()
+    start_of_month, end_of_month = month_bounds(current_year, current_month)
     
     # Last 30 days for recent stats
     thirty_days_ago = today - timedelta(days=30)
@@ -336,36 +388,30 @@ def delivery_dashboard(request):
         count=Count('id')
     )
     
+    # This month's deliveries, shared by the breakdowns below
+    month_deliveries = Delivery.objects.filter(date__range=(start_of_month, end_of_month))
+    
     # Delivery destinations analysis
-    destination_data = Delivery.objects.filter(
-        date__range=(start_of_month, end_of_month)
-    ).values(
+    destination_data = month_deliveries.values(
         'destination'
     ).annotate(
         count=Count('id')
     ).order_by('-count')
     
     # Vehicle performance
-    vehicle_performance = Delivery.objects.filter(
-        date__range=(start_of_month, end_of_month)
-    ).values(
+    vehicle_performance = month_deliveries.values(
         'vehicle__plate_number', 'vehicle__vehicle_type'
     ).annotate(
         delivery_count=Count('id')
     ).order_by('-delivery_count')
     
-    # Average loaders per delivery
-    avg_loaders = Delivery.objects.filter(
-        date__range=(start_of_month, end_of_month)
-    ).annotate(
-        loader_count=Count('staffassignment', filter=Q(staffassignment__helped_loading=True))
-    ).aggregate(
-        avg=Avg('loader_count')
-    )['avg'] or 0
+    # Average loaders per delivery, from the loader count kept on each delivery
+    avg_loaders = month_deliveries.aggregate(avg=Avg('loader_count'))['avg'] or 0
     
-    # Recent deliveries with details
+    # Recent deliveries with details; the slice is applied before the prefetch,
+    # which loads the ten deliveries' assignments with their staff in one query
     recent_deliveries = Delivery.objects.select_related('vehicle').prefetch_related(
-        'staffassignment_set__staff'
+        Prefetch('staffassignment_set', queryset=StaffAssignment.objects.select_related('staff'))
     ).order_by('-date')[:10]
     
     # Context data for template
@@ -377,24 +423,10 @@ def delivery_dashboard(request):
         'vehicle_performance': vehicle_performance,
         'avg_loaders': avg_loaders,
         'recent_deliveries': recent_deliveries,
-        'current_month': calendar.month_name[current_month],
+        'current_month': month_name(current_month),
         'current_year': current_year,
     }
     
-    # Fix for the missing Avg import
-    try:
-        from django.db.models import Avg
-        avg_loaders = Delivery.objects.filter(
-            date__range=(start_of_month, end_of_month)
-        ).annotate(
-            loader_count=Count('staffassignment', filter=Q(staffassignment__helped_loading=True))
-        ).aggregate(
-            avg=Avg('loader_count')
-        )['avg'] or 0
-        context['avg_loaders'] = avg_loaders
-    except ImportError:
-        context['avg_loaders'] = 0
-    
     return render(request, 'dashboard/delivery_dashboard.html', context)
 
 @login_required
@@ -406,9 +438,7 @@ def payroll_dashboard(request):
     current_year = today.year
     
     # Calculate date ranges
-    start_of_month = timezone.datetime(current_year, current_month, 1).date()
-    _, last_day = calendar.monthrange(current_year, current_month)
-    end_of_month = timezone.datetime(current_year, current_month, last_day).date()
+    start_of_month, end_of_month = month_bounds(current_year, current_month)
     
     # Last 6 months for trends
     six_months_ago = today - timedelta(days=180)
@@ -437,20 +467,8 @@ def payroll_dashboard(request):
         monthly_role_pay.append(float(item['role_pay']))
         monthly_loader_pay.append(float(item['loader_pay']))
     
-    # Current month payment status
-    payment_status = MonthlyPayment.objects.filter(
-        year=current_year,
-        month=current_month
-    ).aggregate(
-        total_amount=Sum('total_payment'),
-        paid_amount=Sum('total_payment', filter=Q(is_paid=True)),
-        unpaid_amount=Sum('total_payment', filter=Q(is_paid=False)),
-        paid_count=Count('id', filter=Q(is_paid=True)),
-        unpaid_count=Count('id', filter=Q(is_paid=False))
-    )
-    
-    # Staff payment breakdown by role
-    role_breakdown = MonthlyPayment.objects.filter(
+    # Staff payment breakdown by role, with the paid/unpaid split per role
+    role_breakdown = list(MonthlyPayment.objects.filter(
         year=current_year,
         month=current_month
     ).values(
@@ -458,8 +476,26 @@ def payroll_dashboard(request):
     ).annotate(
         total=Sum('total_payment'),
         role_pay=Sum('role_payment'),
-        loader_pay=Sum('loader_payment')
-    )
+        loader_pay=Sum('loader_payment'),
+        paid_amount=Sum('total_payment', filter=Q(is_paid=True)),
+        unpaid_amount=Sum('total_payment', filter=Q(is_paid=False)),
+        paid_count=Count('id', filter=Q(is_paid=True)),
+        unpaid_count=Count('id', filter=Q(is_paid=False))
+    ).order_by('staff__role'))
+    
+    # Current month payment status: the role rows added up, so the month's
+    # payments are only scanned once
+    def _total(key):
+        amounts = [row[key] for row in role_breakdown if row[key] is not None]
+        return sum(amounts) if amounts else None
+    
+    payment_status = {
+        'total_amount': _total('total'),
+        'paid_amount': _total('paid_amount'),
+        'unpaid_amount': _total('unpaid_amount'),
+        'paid_count': sum(row['paid_count'] for row in role_breakdown),
+        'unpaid_count': sum(row['unpaid_count'] for row in role_breakdown),
+    }
     
     # Pending payments list
     pending_payments = MonthlyPayment.objects.filter(
@@ -487,7 +523,7 @@ def payroll_dashboard(request):
         'pending_payments': pending_payments,
         'recent_payments': recent_payments,
         'custom_period_payments': custom_period_payments,
-        'current_month': calendar.month_name[current_month],
+        'current_month': month_name(current_month),
         'current_year': current_year,
     }
     
@@ -497,14 +533,62 @@ def payroll_dashboard(request):
 
 # /////MonthlyPayroll View//////
 
+# Month choices for the payroll filter dropdown
+MONTHS = tuple((i, month_name(i)) for i in range(1, 13))
+
+
+def _month_staff_totals(year, month):
+    """
+    Per-staff payment totals and turnboy delivery counts for a month, each from
+    one grouped query. Cached under the month's payroll version, so the same
+    month selection is only aggregated again once its payroll changes.
+    """
+    cache_key = f'staff_payroll_totals:{year}:{month}:{monthly_payment_version(year, month)}'
+    totals = cache.get(cache_key)
+    if totals is None:
+        date_range = month_bounds(year, month)
+        payroll_totals = {
+            row['staff_id']: row
+            for row in PayrollManager.objects.filter(
+                delivery__date__range=date_range
+            ).values('staff_id').annotate(
+                turnboy_total=Sum('role_pay'),
+                loader_total=Sum('loader_pay'),
+                grand_total=Sum('total_pay'),
+                loader_count=Count('id', filter=Q(loader_pay__gt=0)),
+            ).order_by()
+        }
+        
+        # Deliveries worked as turnboy, also grouped by staff member
+        turnboy_delivery_counts = dict(
+            StaffAssignment.objects.filter(
+                role='turnboy',
+                delivery__date__range=date_range
+            ).values_list('staff_id').annotate(
+                delivery_count=Count('delivery', distinct=True)
+            ).order_by()
+        )
+        
+        totals = (payroll_totals, turnboy_delivery_counts)
+        cache.set(cache_key, totals, MONTHLY_PAYMENT_CACHE_TIMEOUT)
+    return totals
+
+class Echo:
+    """Pseudo-buffer for csv.writer: write() hands each line straight back so
+    the CSV exports can be streamed row by row"""
+    def write(self, value):
+        return value
+
+
 @login_required
 def staff_payroll(request):
     """
     View for generating and viewing staff payroll information with date filtering
     """
     # Get current year and month as defaults
-    current_year = timezone.now().year
-    current_month = timezone.now().month
+    today = timezone.now().date()
+    current_year = today.year
+    current_month = today.month
     
     # Get filter parameters from request
     selected_year = int(request.GET.get('year', current_year))
@@ -513,9 +597,7 @@ def staff_payroll(request):
     role_filter = request.GET.get('role', None)
     
     # Create date range for the selected month
-    start_date = timezone.datetime(selected_year, selected_month, 1).date()
-    _, last_day = calendar.monthrange(selected_year, selected_month)
-    end_date = timezone.datetime(selected_year, selected_month, last_day).date()
+    start_date, end_date = month_bounds(selected_year, selected_month)
     date_range = (start_date, end_date)
     
     # Get all active staff members, excluding drivers
@@ -532,128 +614,157 @@ def staff_payroll(request):
     selected_staff = None
     if staff_id:
         selected_staff = get_object_or_404(Staff, id=staff_id)
-        # Filter to just this staff member
-        staff_query = staff_query.filter(id=staff_id)
+        # Filter to just this staff member; the row itself is already loaded
+        staff_query = Staff.objects.filter(pk=selected_staff.pk)
     
-    # Prepare payroll data for each staff member
+    exporting = request.GET.get('export') == 'csv'
+    
+    # Payment totals and delivery counts for the month, keyed by staff member
+    payroll_totals, turnboy_delivery_counts = _month_staff_totals(selected_year, selected_month)
+    
+    # Prepare payroll data for each staff member, adding up the period
+    # totals as we go
     payroll_data = []
-    for staff in staff_query:
-        # Get all payroll records for this staff member in the date range
-        payroll_records = PayrollManager.objects.filter(
-            staff=staff,
-            delivery__date__range=date_range
-        )
-        
-        # Calculate payment totals
-        payment_totals = payroll_records.aggregate(
-            turnboy_total=Sum('turnboy_pay') or Decimal('0.00'),
-            loader_total=Sum('loader_pay') or Decimal('0.00'),
-            grand_total=Sum('total_pay') or Decimal('0.00')
-        )
+    period_totals = {
+        'turnboy_total': Decimal('0.00'),
+        'loader_total': Decimal('0.00'),
+        'grand_total': Decimal('0.00'),
+    }
+    # Each row keeps its own Staff object, so read them in narrow chunks rather
+    # than filling a second copy in the queryset cache
+    if selected_staff:
+        staff_members = [selected_staff]
+    else:
+        staff_members = staff_query.only('id', 'name', 'role', 'is_loader').iterator(chunk_size=500)
+    for staff in staff_members:
+        totals = payroll_totals.get(staff.id, {})
+        payment_totals = {
+            'turnboy_total': totals.get('turnboy_total') or Decimal('0.00'),
+            'loader_total': totals.get('loader_total') or Decimal('0.00'),
+            'grand_total': totals.get('grand_total') or Decimal('0.00'),
+        }
+        for key, amount in payment_totals.items():
+            period_totals[key] += amount
         
         # Get delivery count for this staff member
         delivery_count = 0
         if staff.role == 'turnboy':
-            delivery_count = Delivery.objects.filter(
-                turnboy=staff,
-                date__range=date_range
-            ).count()
+            delivery_count = turnboy_delivery_counts.get(staff.id, 0)
         
         # Get loader assignment count
         loader_count = 0
         if staff.is_loader:
-            loader_count = payroll_records.filter(loader_pay__gt=0).count()
-        
-        # Check if a MonthlyPayment record exists for this staff member
-        monthly_payment, created = MonthlyPayment.objects.get_or_create(
-            staff=staff,
-            year=selected_year,
-            month=selected_month,
-            defaults={
-                'turnboy_payment': payment_totals['turnboy_total'] or Decimal('0.00'),
-                'loader_payment': payment_totals['loader_total'] or Decimal('0.00'),
-                'total_payment': payment_totals['grand_total'] or Decimal('0.00'),
-            }
-        )
+            loader_count = totals.get('loader_count', 0)
         
-        # If record exists but needs updating, update it
-        if not created:
-            monthly_payment.turnboy_payment = payment_totals['turnboy_total'] or Decimal('0.00')
-            monthly_payment.loader_payment = payment_totals['loader_total'] or Decimal('0.00')
-            monthly_payment.total_payment = payment_totals['grand_total'] or Decimal('0.00')
-            monthly_payment.save()
-        
-        # Get delivery details for this staff member
+        # Get delivery details for this staff member, loaded once here so the
+        # template works from a plain list (the CSV export doesn't show them)
         staff_deliveries = []
-        if selected_staff and staff.id == selected_staff.id:
-            staff_deliveries = payroll_records.select_related('delivery', 'delivery__vehicle')
+        if selected_staff and staff.id == selected_staff.id and not exporting:
+            staff_deliveries = list(PayrollManager.objects.filter(
+                staff=staff,
+                delivery__date__range=date_range
+            ).with_related())
         
         # Add staff data to the payroll data list
         payroll_data.append({
             'staff': staff,
-            'turnboy_total': payment_totals['turnboy_total'] or Decimal('0.00'),
-            'loader_total': payment_totals['loader_total'] or Decimal('0.00'),
-            'grand_total': payment_totals['grand_total'] or Decimal('0.00'),
+            'turnboy_total': payment_totals['turnboy_total'],
+            'loader_total': payment_totals['loader_total'],
+            'grand_total': payment_totals['grand_total'],
             'delivery_count': delivery_count,
             'loader_count': loader_count,
-            'is_paid': monthly_payment.is_paid,
-            'payment_date': monthly_payment.payment_date,
             'deliveries': staff_deliveries
         })
     
-    # Prepare data for year/month filter dropdowns
+    # Prepare data for the year filter dropdown (months are the MONTHS constant)
     years = range(current_year - 2, current_year + 1)  # Current year and 2 years back
-    months = [(i, calendar.month_name[i]) for i in range(1, 13)]
     
     # Process payroll action
     if request.method == 'POST' and 'mark_paid' in request.POST:
         staff_ids = request.POST.getlist('staff_id')
-        for staff_id in staff_ids:
-            payment = MonthlyPayment.objects.get(
-                staff_id=staff_id,
-                year=selected_year,
-                month=selected_month
-            )
-            payment.is_paid = True
-            payment.payment_date = timezone.now().date()
-            payment.save()
+        
+        # MonthlyPayment records are only written when payments are recorded.
+        # Create or refresh the ones being paid in one INSERT ... ON CONFLICT.
+        paying = set(staff_ids)
+        MonthlyPayment.objects.bulk_create(
+            [
+                MonthlyPayment(
+                    staff=data['staff'],
+                    year=selected_year,
+                    month=selected_month,
+                    role_payment=data['turnboy_total'],
+                    loader_payment=data['loader_total'],
+                )
+                for data in payroll_data
+                if str(data['staff'].id) in paying
+            ],
+            update_conflicts=True,
+            unique_fields=['staff', 'year', 'month'],
+            update_fields=['role_payment', 'loader_payment'],
+        )
+        
+        MonthlyPayment.objects.filter(
+            staff_id__in=staff_ids,
+            year=selected_year,
+            month=selected_month
+        ).update(is_paid=True, payment_date=today)
+        invalidate_dashboard()
         messages.success(request, f"Marked {len(staff_ids)} staff payments as paid")
-        return redirect(request.get_full_path())
+        # No redirect: the page below is already built for this month, and the
+        # status read that follows picks up the payments just recorded
+    
+    # Payment status for the staff whose month has already been recorded;
+    # everyone else shows as unpaid
+    payment_status = {
+        row['staff_id']: row
+        for row in MonthlyPayment.objects.filter(
+            year=selected_year,
+            month=selected_month,
+            staff__in=staff_query
+        ).values('staff_id', 'is_paid', 'payment_date')
+    }
+    for data in payroll_data:
+        status = payment_status.get(data['staff'].id, {})
+        data['is_paid'] = status.get('is_paid', False)
+        data['payment_date'] = status.get('payment_date')
     
     # Handle CSV export
-    if request.GET.get('export') == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="payroll_{selected_month}_{selected_year}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Staff Name', 'Role', 'Turnboy Payment', 'Loader Payment', 'Total Payment', 'Status'])
+    if exporting:
+        writer = csv.writer(Echo())
         
-        for data in payroll_data:
-            staff = data['staff']
-            writer.writerow([
-                staff.name,
-                staff.get_role_display(),
-                data['turnboy_total'],
-                data['loader_total'],
-                data['grand_total'],
-                'Paid' if data['is_paid'] else 'Unpaid'
-            ])
+        def rows():
+            yield writer.writerow(['Staff Name', 'Role', 'Turnboy Payment', 'Loader Payment', 'Total Payment', 'Status'])
+            
+            for data in payroll_data:
+                staff = data['staff']
+                yield writer.writerow([
+                    staff.name,
+                    staff.get_role_display(),
+                    data['turnboy_total'],
+                    data['loader_total'],
+                    data['grand_total'],
+                    'Paid' if data['is_paid'] else 'Unpaid'
+                ])
         
-        return response
+        return StreamingHttpResponse(
+            rows(),
+            content_type='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="payroll_{selected_month}_{selected_year}.csv"'}
+        )
     
     context = {
         'payroll_data': payroll_data,
         'selected_year': selected_year,
         'selected_month': selected_month,
-        'selected_month_name': calendar.month_name[selected_month],
+        'selected_month_name': month_name(selected_month),
         'selected_staff': selected_staff,
         'role_filter': role_filter,
         'years': years,
-        'months': months,
+        'months': MONTHS,
         'date_range': f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d, %Y')}",
-        'total_payroll': sum(data['grand_total'] for data in payroll_data),
-        'total_turnboy_pay': sum(data['turnboy_total'] for data in payroll_data),
-        'total_loader_pay': sum(data['loader_total'] for data in payroll_data),
+        'total_payroll': period_totals['grand_total'],
+        'total_turnboy_pay': period_totals['turnboy_total'],
+        'total_loader_pay': period_totals['loader_total'],
         'total_staff': len(payroll_data),
     }
     
@@ -663,6 +774,44 @@ def staff_payroll(request):
 
 # ////// Period Payroll View //////
 
+def _selected_staff(request, staff_ids):
+    """Staff for the ticked ids, keyed by id; ids that no longer exist are reported"""
+    selected = Staff.objects.in_bulk(staff_ids)
+    found = {str(pk) for pk in selected}
+    for staff_id in staff_ids:
+        if staff_id not in found:
+            messages.error(request, f'Staff with ID {staff_id} not found.')
+    return selected
+
+
+def _period_payments(staff, date_range):
+    """Role and loader payment totals per staff member over a date range, from one grouped query"""
+    return {
+        row['staff_id']: row
+        for row in PayrollManager.objects.filter(
+            staff__in=staff,
+            delivery__date__range=date_range
+        ).values('staff_id').annotate(
+            role_payment=Sum('role_pay'),
+            loader_payment=Sum('loader_pay')
+        ).order_by()
+    }
+
+
+def _staff_period_totals(staff, date_range):
+    """One staff member's payment totals and delivery count over a date range"""
+    zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=10, decimal_places=2))
+    return PayrollManager.objects.filter(
+        staff=staff,
+        delivery__date__range=date_range
+    ).aggregate(
+        role_payment=Coalesce(Sum('role_pay'), zero),
+        loader_payment=Coalesce(Sum('loader_pay'), zero),
+        total_payment=Coalesce(Sum('total_pay'), zero),
+        delivery_count=Count('delivery', distinct=True)
+    )
+
+
 @login_required
 def period_payroll(request):
     """
@@ -725,55 +874,37 @@ def period_payroll(request):
             messages.warning(request, 'No staff members were selected.')
             return redirect(f"{request.path}?start_date={start_date}&end_date={end_date}")
         
-        # Update payment periods for each selected staff member
-        update_count = 0
-        for staff_id in selected_staff_ids:
-            try:
-                payment_period = PaymentPeriod.objects.get(
-                    staff_id=staff_id,
+        selected = _selected_staff(request, selected_staff_ids)
+        payment_date = today
+        
+        # Payment periods already recorded for this range are paid in one UPDATE
+        existing_periods = PaymentPeriod.objects.filter(
+            staff__in=selected.values(),
+            period_start=start_date,
+            period_end=end_date
+        )
+        recorded_staff_ids = set(existing_periods.values_list('staff_id', flat=True))
+        existing_periods.update(is_paid=True, payment_date=payment_date)
+        
+        # The rest are created already paid, from one grouped payroll query
+        new_staff = [staff for staff in selected.values() if staff.id not in recorded_staff_ids]
+        if new_staff:
+            payments = _period_payments(new_staff, date_range)
+            PaymentPeriod.objects.bulk_create([
+                PaymentPeriod(
+                    staff=staff,
                     period_start=start_date,
-                    period_end=end_date
+                    period_end=end_date,
+                    role_payment=payments.get(staff.id, {}).get('role_payment') or 0,
+                    loader_payment=payments.get(staff.id, {}).get('loader_payment') or 0,
+                    is_paid=True,
+                    payment_date=payment_date,
+                    admin=request.user
                 )
-                payment_period.is_paid = True
-                payment_period.payment_date = timezone.now().date()
-                payment_period.save()
-                update_count += 1
-            except PaymentPeriod.DoesNotExist:
-                # If payment period doesn't exist, create it first
-                try:
-                    staff = Staff.objects.get(id=staff_id)
-                    
-                    # Calculate payments for this staff and period
-                    payments = PayrollManager.objects.filter(
-                        staff=staff,
-                        delivery__date__range=date_range
-                    ).aggregate(
-                        role_payment=Sum('role_pay'),
-                        loader_payment=Sum('loader_pay'),
-                        total_payment=Sum('total_pay')
-                    )
-                    
-                    role_payment = payments['role_payment'] or 0
-                    loader_payment = payments['loader_payment'] or 0
-                    total_payment = payments['total_payment'] or 0
-                    
-                    # Create payment period
-                    PaymentPeriod.objects.create(
-                        staff=staff,
-                        period_start=start_date,
-                        period_end=end_date,
-                        role_payment=role_payment,
-                        loader_payment=loader_payment,
-                        total_payment=total_payment,
-                        is_paid=True,
-                        payment_date=timezone.now().date(),
-                        admin=request.user
-                    )
-                    update_count += 1
-                except Staff.DoesNotExist:
-                    messages.error(request, f'Staff with ID {staff_id} not found.')
-                    continue
+                for staff in new_staff
+            ])
         
+        update_count = len(selected)
         if update_count > 0:
             messages.success(request, f'Successfully marked {update_count} staff payments as paid.')
         
@@ -787,74 +918,109 @@ def period_payroll(request):
             messages.warning(request, 'No staff members were selected.')
             return redirect(f"{request.path}?start_date={start_date}&end_date={end_date}")
         
-        # Create payment periods for each selected staff member
-        created_count = 0
-        for staff_id in selected_staff_ids:
-            try:
-                staff = Staff.objects.get(id=staff_id)
-                
-                # Calculate payments for this staff and period
-                payments = PayrollManager.objects.filter(
-                    staff=staff,
-                    delivery__date__range=date_range
-                ).aggregate(
-                    role_payment=Sum('role_pay'),
-                    loader_payment=Sum('loader_pay'),
-                    total_payment=Sum('total_pay')
-                )
-                
-                role_payment = payments['role_payment'] or 0
-                loader_payment = payments['loader_payment'] or 0
-                total_payment = payments['total_payment'] or 0
-                
-                # Create or update payment period
-                payment_period, created = PaymentPeriod.objects.update_or_create(
+        selected = _selected_staff(request, selected_staff_ids)
+        
+        # Calculate payments for every selected staff member and period
+        payments = _period_payments(selected.values(), date_range)
+        
+        # Update the payment periods already recorded for this range (the
+        # earliest per staff member) and create the rest, in two batches
+        existing_periods = {}
+        for period in PaymentPeriod.objects.filter(
+            staff__in=selected.values(),
+            period_start=start_date,
+            period_end=end_date
+        ).order_by('pk'):
+            existing_periods.setdefault(period.staff_id, period)
+        
+        to_update = []
+        to_create = []
+        for staff in selected.values():
+            role_payment = payments.get(staff.id, {}).get('role_payment') or 0
+            loader_payment = payments.get(staff.id, {}).get('loader_payment') or 0
+            payment_period = existing_periods.get(staff.id)
+            if payment_period:
+                payment_period.role_payment = role_payment
+                payment_period.loader_payment = loader_payment
+                payment_period.admin = request.user
+                to_update.append(payment_period)
+            else:
+                to_create.append(PaymentPeriod(
                     staff=staff,
                     period_start=start_date,
                     period_end=end_date,
-                    defaults={
-                        'role_payment': role_payment,
-                        'loader_payment': loader_payment,
-                        'total_payment': total_payment,
-                        'admin': request.user
-                    }
-                )
-                
-                created_count += 1
-            except Staff.DoesNotExist:
-                messages.error(request, f'Staff with ID {staff_id} not found.')
-                continue
+                    role_payment=role_payment,
+                    loader_payment=loader_payment,
+                    admin=request.user
+                ))
+        
+        PaymentPeriod.objects.bulk_update(to_update, ['role_payment', 'loader_payment', 'admin'])
+        PaymentPeriod.objects.bulk_create(to_create)
         
+        created_count = len(selected)
         if created_count > 0:
             messages.success(request, f'Successfully created payment periods for {created_count} staff members.')
         
         return redirect(f"{request.path}?start_date={start_date}&end_date={end_date}")
     
+    # Payment totals for every listed staff member, annotated in one query
+    in_period = Q(payrollmanager__delivery__date__range=date_range)
+    staff_totals = staff_query.annotate(
+        role_payment=Sum('payrollmanager__role_pay', filter=in_period),
+        loader_payment=Sum('payrollmanager__loader_pay', filter=in_period),
+        total_payment=Sum('payrollmanager__total_pay', filter=in_period),
+        delivery_count=Count('payrollmanager__delivery', filter=in_period, distinct=True)
+    )
+    
+    # PaymentPeriods already recorded for this exact range, keeping the
+    # earliest one per staff member
+    existing_periods = {}
+    for period in PaymentPeriod.objects.filter(
+        staff__in=staff_query,
+        period_start=start_date,
+        period_end=end_date
+    ).order_by('pk'):
+        existing_periods.setdefault(period.staff_id, period)
+    
+    # Handle CSV export, streamed straight from the annotated staff rows
+    if request.GET.get('export') == 'csv':
+        writer = csv.writer(Echo())
+        
+        def rows():
+            yield writer.writerow(['Staff Name', 'Role', 'Deliveries', 'Role Payment', 'Loader Payment', 'Total Payment', 'Status'])
+            
+            # Highest paid first, as on the page
+            for staff in staff_totals.order_by(
+                F('total_payment').desc(nulls_last=True), 'pk'
+            ).iterator(chunk_size=2000):
+                existing_period = existing_periods.get(staff.id)
+                yield writer.writerow([
+                    staff.name,
+                    staff.get_role_display(),
+                    staff.delivery_count or 0,
+                    staff.role_payment or Decimal('0.00'),
+                    staff.loader_payment or Decimal('0.00'),
+                    staff.total_payment or Decimal('0.00'),
+                    'Paid' if existing_period and existing_period.is_paid else 'Unpaid'
+                ])
+        
+        return StreamingHttpResponse(
+            rows(),
+            content_type='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="period_payroll_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.csv"'}
+        )
+    
     # Prepare payroll data for each staff member
     staff_payments = []
     total_role_pay = Decimal('0.00')
     total_loader_pay = Decimal('0.00')
     total_pay = Decimal('0.00')
     
-    for staff in staff_query:
-        # Get all payroll records for this staff member in the date range
-        payroll_records = PayrollManager.objects.filter(
-            staff=staff,
-            delivery__date__range=date_range
-        )
-        
-        # Calculate payment totals
-        payment_data = payroll_records.aggregate(
-            role_payment=Sum('role_pay'),
-            loader_payment=Sum('loader_pay'),
-            total_payment=Sum('total_pay'),
-            delivery_count=Count('delivery', distinct=True)
-        )
-        
-        role_payment = payment_data['role_payment'] or Decimal('0.00')
-        loader_payment = payment_data['loader_payment'] or Decimal('0.00')
-        total_payment = payment_data['total_payment'] or Decimal('0.00')
-        delivery_count = payment_data['delivery_count'] or 0
+    for staff in staff_totals:
+        role_payment = staff.role_payment or Decimal('0.00')
+        loader_payment = staff.loader_payment or Decimal('0.00')
+        total_payment = staff.total_payment or Decimal('0.00')
+        delivery_count = staff.delivery_count or 0
         
         # Add to running totals
         total_role_pay += role_payment
@@ -862,16 +1028,16 @@ def period_payroll(request):
         total_pay += total_payment
         
         # Check if a PaymentPeriod already exists for this staff and date range
-        existing_period = PaymentPeriod.objects.filter(
-            staff=staff,
-            period_start=start_date,
-            period_end=end_date
-        ).first()
+        existing_period = existing_periods.get(staff.id)
         
-        # Get delivery details for this staff
+        # Get delivery details for this staff, loaded once here so the
+        # template works from a plain list
         staff_deliveries = []
         if selected_staff and staff.id == selected_staff.id:
-            staff_deliveries = payroll_records.select_related('delivery', 'delivery__vehicle').order_by('-delivery__date')
+            staff_deliveries = list(PayrollManager.objects.filter(
+                staff=staff,
+                delivery__date__range=date_range
+            ).with_related().order_by('-delivery__date'))
         
         # Add to staff_payments list
         staff_payments.append({
@@ -889,28 +1055,6 @@ def period_payroll(request):
     # Sort by total payment (highest first)
     staff_payments.sort(key=lambda x: x['total_payment'], reverse=True)
     
-    # Handle CSV export
-    if request.GET.get('export') == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="period_payroll_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Staff Name', 'Role', 'Deliveries', 'Role Payment', 'Loader Payment', 'Total Payment', 'Status'])
-        
-        for data in staff_payments:
-            staff = data['staff']
-            writer.writerow([
-                staff.name,
-                staff.get_role_display(),
-                data['delivery_count'],
-                data['role_payment'],
-                data['loader_payment'],
-                data['total_payment'],
-                'Paid' if data['is_paid'] else 'Unpaid'
-            ])
-        
-        return response
-    
     context = {
         'staff_payments': staff_payments,
         'start_date': start_date,
@@ -961,8 +1105,8 @@ def individual_payroll(request):
     # Get staff ID from request
     staff_id = request.GET.get('staff_id')
     
-    # Get all active staff, excluding drivers
-    all_staff = Staff.objects.filter(is_active=True).exclude(role='driver')
+    # Get all active staff, excluding drivers, for the staff picker
+    all_staff = Staff.active_choices()
     
     # Get specific staff member if requested
     selected_staff = None
@@ -971,66 +1115,15 @@ def individual_payroll(request):
     if staff_id:
         try:
             selected_staff = Staff.objects.get(id=staff_id)
-            
-            # Get all payroll records for this staff member in the date range
-            payroll_records = PayrollManager.objects.filter(
-                staff=selected_staff,
-                delivery__date__range=date_range
-            ).select_related('delivery', 'delivery__vehicle')
-            
-            # Calculate payment totals
-            payment_data = payroll_records.aggregate(
-                role_payment=Sum('role_pay'),
-                loader_payment=Sum('loader_pay'),
-                total_payment=Sum('total_pay'),
-                delivery_count=Count('delivery', distinct=True)
-            )
-            
-            role_payment = payment_data['role_payment'] or Decimal('0.00')
-            loader_payment = payment_data['loader_payment'] or Decimal('0.00')
-            total_payment = payment_data['total_payment'] or Decimal('0.00')
-            delivery_count = payment_data['delivery_count'] or 0
-            
-            # Check if a PaymentPeriod already exists for this staff and date range
-            existing_period = PaymentPeriod.objects.filter(
-                staff=selected_staff,
-                period_start=start_date,
-                period_end=end_date
-            ).first()
-            
-            # Get delivery details for this staff
-            deliveries = payroll_records.order_by('-delivery__date')
-            
-            staff_data = {
-                'staff': selected_staff,
-                'role_payment': role_payment,
-                'loader_payment': loader_payment,
-                'total_payment': total_payment,
-                'delivery_count': delivery_count,
-                'existing_period': existing_period,
-                'is_paid': existing_period.is_paid if existing_period else False,
-                'payment_date': existing_period.payment_date if existing_period else None,
-                'deliveries': deliveries
-            }
-            
         except Staff.DoesNotExist:
             messages.error(request, f'Staff with ID {staff_id} not found.')
     
     # Process form submission for creating payment period
     if request.method == 'POST' and 'create_payment_period' in request.POST and selected_staff:
         # Calculate payments for this staff and period
-        payments = PayrollManager.objects.filter(
-            staff=selected_staff,
-            delivery__date__range=date_range
-        ).aggregate(
-            role_payment=Sum('role_pay'),
-            loader_payment=Sum('loader_pay'),
-            total_payment=Sum('total_pay')
-        )
-        
-        role_payment = payments['role_payment'] or 0
-        loader_payment = payments['loader_payment'] or 0
-        total_payment = payments['total_payment'] or 0
+        payments = _staff_period_totals(selected_staff, date_range)
+        role_payment = payments['role_payment']
+        loader_payment = payments['loader_payment']
         
         # Create or update payment period
         payment_period, created = PaymentPeriod.objects.update_or_create(
@@ -1040,7 +1133,6 @@ def individual_payroll(request):
             defaults={
                 'role_payment': role_payment,
                 'loader_payment': loader_payment,
-                'total_payment': total_payment,
                 'admin': request.user
             }
         )
@@ -1061,24 +1153,15 @@ def individual_payroll(request):
                 period_end=end_date
             )
             payment_period.is_paid = True
-            payment_period.payment_date = timezone.now().date()
-            payment_period.save()
+            payment_period.payment_date = today
+            payment_period.save(update_fields=['is_paid', 'payment_date'])
             
             messages.success(request, f'Payment for {selected_staff.name} marked as paid.')
         except PaymentPeriod.DoesNotExist:
             # If payment period doesn't exist, create it first and mark as paid
-            payments = PayrollManager.objects.filter(
-                staff=selected_staff,
-                delivery__date__range=date_range
-            ).aggregate(
-                role_payment=Sum('role_pay'),
-                loader_payment=Sum('loader_pay'),
-                total_payment=Sum('total_pay')
-            )
-            
-            role_payment = payments['role_payment'] or 0
-            loader_payment = payments['loader_payment'] or 0
-            total_payment = payments['total_payment'] or 0
+            payments = _staff_period_totals(selected_staff, date_range)
+            role_payment = payments['role_payment']
+            loader_payment = payments['loader_payment']
             
             PaymentPeriod.objects.create(
                 staff=selected_staff,
@@ -1086,9 +1169,8 @@ def individual_payroll(request):
                 period_end=end_date,
                 role_payment=role_payment,
                 loader_payment=loader_payment,
-                total_payment=total_payment,
                 is_paid=True,
-                payment_date=timezone.now().date(),
+                payment_date=today,
                 admin=request.user
             )
             
@@ -1096,28 +1178,87 @@ def individual_payroll(request):
         
         return redirect(f"{request.path}?staff_id={staff_id}&start_date={start_date}&end_date={end_date}")
     
-    # Handle CSV export
-    if request.GET.get('export') == 'csv' and selected_staff and staff_data:
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{selected_staff.name}_payroll_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.csv"'
+    # The POST handlers above redirect, so the figures are only worked out for
+    # the page and the CSV export
+    if selected_staff:
+        # Get all payroll records for this staff member in the date range
+        payroll_records = PayrollManager.objects.filter(
+            staff=selected_staff,
+            delivery__date__range=date_range
+        )
         
-        writer = csv.writer(response)
-        writer.writerow(['Delivery Date', 'Vehicle', 'Turnboy Payment', 'Loader Payment', 'Total Payment'])
+        # Calculate payment totals
+        payment_data = _staff_period_totals(selected_staff, date_range)
+        role_payment = payment_data['role_payment']
+        loader_payment = payment_data['loader_payment']
+        total_payment = payment_data['total_payment']
+        delivery_count = payment_data['delivery_count']
         
-        for delivery in staff_data['deliveries']:
-            writer.writerow([
-                delivery.delivery.date.strftime('%Y-%m-%d'),
-                delivery.delivery.vehicle.plate_number if delivery.delivery.vehicle else 'N/A',
-                delivery.role_pay,
-                delivery.loader_pay,
-                delivery.total_pay
-            ])
+        # Check if a PaymentPeriod already exists for this staff and date range;
+        # the page only shows whether and when it was paid
+        existing_period = PaymentPeriod.objects.filter(
+            staff=selected_staff,
+            period_start=start_date,
+            period_end=end_date
+        ).values('id', 'is_paid', 'payment_date').first()
         
-        # Add summary row
-        writer.writerow(['', '', '', '', ''])
-        writer.writerow(['SUMMARY', '', staff_data['role_payment'], staff_data['loader_payment'], staff_data['total_payment']])
+        # Get delivery details for this staff; the table shows them a page
+        # at a time, with the id as a tie-breaker so pages stay stable.
+        # The staff member is already known, so only the delivery and
+        # vehicle columns the table and CSV show are joined in.
+        deliveries = payroll_records.select_related('delivery__vehicle').only(
+            'role_pay', 'loader_pay', 'total_pay',
+            'delivery__date', 'delivery__destination', 'delivery__items_carried',
+            'delivery__vehicle__plate_number'
+        ).order_by('-delivery__date', '-delivery_id')
         
-        return response
+        staff_data = {
+            'staff': selected_staff,
+            'role_payment': role_payment,
+            'loader_payment': loader_payment,
+            'total_payment': total_payment,
+            'delivery_count': delivery_count,
+            'existing_period': existing_period,
+            'is_paid': existing_period['is_paid'] if existing_period else False,
+            'payment_date': existing_period['payment_date'] if existing_period else None,
+            'deliveries': deliveries
+        }
+    
+    # Handle CSV export
+    if request.GET.get('export') == 'csv' and selected_staff and staff_data:
+        writer = csv.writer(Echo())
+        
+        def rows():
+            yield writer.writerow(['Delivery Date', 'Vehicle', 'Turnboy Payment', 'Loader Payment', 'Total Payment'])
+            
+            # Stream the rows in chunks instead of caching the whole period; the
+            # columns come straight from the cursor as tuples, in CSV order
+            export_rows = staff_data['deliveries'].values_list(
+                'delivery__date', 'delivery__vehicle__plate_number',
+                'role_pay', 'loader_pay', 'total_pay'
+            )
+            for date, plate_number, role_pay, loader_pay, total_pay in export_rows.iterator(chunk_size=2000):
+                yield writer.writerow([
+                    date.isoformat(),
+                    plate_number or 'N/A',
+                    role_pay,
+                    loader_pay,
+                    total_pay
+                ])
+            
+            # Add summary row
+            yield writer.writerow(['', '', '', '', ''])
+            yield writer.writerow(['SUMMARY', '', staff_data['role_payment'], staff_data['loader_payment'], staff_data['total_payment']])
+        
+        return StreamingHttpResponse(
+            rows(),
+            content_type='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{selected_staff.name}_payroll_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.csv"'}
+        )
+    
+    # Only the rendered page needs the current page of deliveries
+    if staff_data:
+        staff_data['deliveries_page'] = Paginator(staff_data['deliveries'], 25).get_page(request.GET.get('page'))
     
     context = {
         'page_title': 'Individual Staff Payroll',
@@ -1140,7 +1281,7 @@ def mark_period_paid(request, period_id):
             period = PaymentPeriod.objects.get(id=period_id)
             period.is_paid = True
             period.payment_date = timezone.now().date()
-            period.save()
+            period.save(update_fields=['is_paid', 'payment_date'])
             messages.success(request, f'Payment for {period.staff.name} marked as paid.')
         except PaymentPeriod.DoesNotExist:
             messages.error(request, 'Payment period not found.')
@@ -1170,13 +1311,11 @@ def create_payment_period_form(request):
                 delivery__date__range=date_range
             ).aggregate(
                 role_payment=Sum('role_pay'),
-                loader_payment=Sum('loader_pay'),
-                total_payment=Sum('total_pay')
+                loader_payment=Sum('loader_pay')
             )
             
             payment_period.role_payment = payments['role_payment'] or 0
             payment_period.loader_payment = payments['loader_payment'] or 0
-            payment_period.total_payment = payments['total_payment'] or 0
             payment_period.save()
             
             messages.success(request, f'Payment period created for {staff.name}.')
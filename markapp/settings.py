@@ -68,6 +68,42 @@ DATABASES = {
 }
 
 
+# Cache
+# File based, so every gunicorn worker shares the same entries and sees the
+# same invalidations. Each version bump leaves the old entries to time out, so
+# the limit is well above Django's default of 300 to keep the cache from
+# culling (a random third of its files at a time) under normal use.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+
+# Logging
+# The app's debug messages (such as the dashboard's ?explain=1 query plans) go
+# to the console while DEBUG is on
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'app': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if DEBUG else 'INFO',
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 